@@ -1,14 +1,18 @@
 from flask import Flask, render_template, redirect, url_for, request, jsonify, flash
-from camera import capture_image, picam_unavailability_logging, Picamera2
+from camera import picam_unavailability_logging, Picamera2
 from settings import load_settings, save_settings, get_interval_minutes_from_settings, parse_form_settings
 from config import Config
 from logger import setup_logger
+from capture_queue import start_capture_queue, stop_capture_queue, get_capture_queue
 from background_capture import start_background_thread, stop_background_thread, compute_next_in_minutes
-from external_access import start_cloudflare_quick_tunnel
+from external_access import start_tunnel_supervisor, get_tunnel_status
 from extensions import db
 from flask_migrate import Migrate
 from models import Plant
 import os
+import sys
+import signal
+import atexit
 import threading
 
 # -------------------------------
@@ -40,6 +44,11 @@ Migrate(app, db)
 # Lock to prevent race conditions in background capture
 background_lock = threading.Lock()
 
+# Capture queue serializing manual and scheduled captures; started by the
+# serving process only, not by CLI commands such as `flask db upgrade`
+capture_queue_lock = threading.Lock()
+capture_queue_started = False
+
 # -------------------------------
 # Helper functions
 # -------------------------------
@@ -84,6 +93,31 @@ def remove_image(filename):
         logger.exception("Failed to remove image")
         flash("Failed to delete image.", "error")
 
+# --- Services ---
+def ensure_capture_queue():
+    """Start the capture queue once per serving process."""
+    global capture_queue_started
+    with capture_queue_lock:
+        if capture_queue_started:
+            return
+        capture_queue_started = True
+        try:
+            start_capture_queue(lambda: app.config['SETTINGS'])
+        except Exception as e:
+            logger.exception("Failed to start capture queue")
+
+def shutdown_services():
+    """Stop background capture and the capture queue on a clean shutdown."""
+    stop_background_thread(join=True)
+    stop_capture_queue()
+
+atexit.register(shutdown_services)
+
+# Turn SIGTERM (e.g. systemctl stop) into a normal exit so shutdown_services runs,
+# unless a server has already installed its own handler
+if threading.current_thread() is threading.main_thread() and signal.getsignal(signal.SIGTERM) == signal.SIG_DFL:
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+
 # --- Background capture handling ---
 def update_background_capture(start=None, interval=None):
     """
@@ -136,6 +170,10 @@ def save_plant(plant, name, location):
 # -------------------------------
 # Routes
 # -------------------------------
+@app.before_request
+def start_services():
+    ensure_capture_queue()
+
 # --- Dashboard ---
 @app.route('/')
 def index():
@@ -147,15 +185,33 @@ def index():
         background_capture_next_in=compute_next_in_minutes()
     )
 
-@app.route('/capture')
+@app.route('/capture', methods=['POST'])
 def capture():
     try:
-        capture_image(app.config['SETTINGS'])
-        flash("Image captured successfully!", "success")
+        job_id = get_capture_queue().submit('manual')
     except Exception as e:
-        logger.exception("Image capture failed")
-        flash("Failed to capture image.", "error")
-    return redirect(url_for('index'))
+        logger.exception("Failed to queue image capture")
+        return jsonify({'error': str(e)}), 503
+    return jsonify(get_capture_queue().get(job_id)), 202
+
+@app.route('/capture/<job_id>')
+def capture_job(job_id):
+    job = get_capture_queue().get(job_id)
+    if job is None:
+        return jsonify({'error': 'Unknown capture job'}), 404
+    return jsonify(job)
+
+@app.route('/capture_jobs')
+def capture_jobs():
+    return jsonify(get_capture_queue().list_jobs(state=request.args.get('state')))
+
+@app.route('/capture_jobs/backfill', methods=['POST'])
+def backfill_capture_jobs():
+    job_id = get_capture_queue().backfill()
+    if job_id is None:
+        return jsonify({'job_id': None, 'message': 'Nothing to backfill'})
+    logger.info(f"Backfill capture queued as job {job_id}")
+    return jsonify(get_capture_queue().get(job_id)), 202
 
 @app.route('/toggle_background_capture', methods=['POST'])
 def toggle_background_capture():
@@ -169,6 +225,10 @@ def background_capture_status():
     next_in = compute_next_in_minutes()
     return jsonify({'active': next_in is not None, 'next_in': next_in})
 
+@app.route('/tunnel_status')
+def tunnel_status():
+    return jsonify(get_tunnel_status())
+
 @app.route('/latest_image')
 def latest_image():
     return jsonify({'url': get_latest_image_url()})
@@ -248,16 +308,26 @@ def settings():
         return redirect(url_for('settings'))
 
     current_settings = load_settings(app.config['SETTINGS_FILE'])
-    return render_template('settings.html', **current_settings, active_page='settings')
+    return render_template(
+        'settings.html',
+        **current_settings,
+        active_page='settings',
+        burst_max_frames=Config.BURST_MAX_FRAMES,
+        burst_default_frames=Config.BURST_DEFAULT_FRAMES,
+        bracket_default_stops=Config.BRACKET_DEFAULT_STOPS
+    )
 
 # -------------------------------
 # Main
 # -------------------------------
 if __name__ == '__main__':
+    # Start eagerly so interrupted/missed captures are reported at startup
+    ensure_capture_queue()
+
     try:
         if app.config.get('CLOUDFLARE_ENABLED', False):
-            start_cloudflare_quick_tunnel()
+            start_tunnel_supervisor(port=app.config['FLASK_PORT'])
     except Exception as e:
-        logger.exception("Failed to start Cloudflare Quick Tunnel")
+        logger.exception("Failed to start Cloudflare tunnel supervisor")
     
-    app.run(host='0.0.0.0', port=5000, debug=app.config.get('DEBUG', False))
+    app.run(host=app.config['FLASK_HOST'], port=app.config['FLASK_PORT'], debug=app.config.get('DEBUG', False))
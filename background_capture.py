@@ -1,6 +1,6 @@
 import threading
 import time
-from camera import capture_image
+from capture_queue import get_capture_queue
 from logger import setup_logger
 from config import Config
 
@@ -31,10 +31,10 @@ class BackgroundCaptureThread(threading.Thread):
 
         try:
             # Capture immediately
-            capture_image(self.settings_getter())
+            get_capture_queue().submit('scheduled')
 
             # Shedule next capture
-            self.next_capture_time = time.time() + self.interval_s
+            self._schedule_next()
 
             while not self._stop_event.is_set():
                 # Sleep until it's time to capture (supports precise countdown)
@@ -47,13 +47,20 @@ class BackgroundCaptureThread(threading.Thread):
                 if self._stop_event.is_set():
                     break
 
-                # Perform capture
-                capture_image(self.settings_getter())
+                # Queue capture
+                get_capture_queue().submit('scheduled')
 
                 # Schedule next
-                self.next_capture_time = time.time() + self.interval_s
+                self._schedule_next()
         finally:
             self.is_running = False
+            # Written from this thread so no schedule record can follow it
+            get_capture_queue().clear_schedule()
+
+    def _schedule_next(self):
+        """Set the next capture time and journal it for missed-capture detection."""
+        self.next_capture_time = time.time() + self.interval_s
+        get_capture_queue().record_schedule(self.next_capture_time, self.interval_s)
 
     def stop(self):
         """Signal the thread to stop and return immediately."""
@@ -61,7 +68,7 @@ class BackgroundCaptureThread(threading.Thread):
 
     def reset_schedule_now(self):
         """Reschedule next capture from 'now' (used after saving settings)."""
-        self.next_capture_time = time.time() + self.interval_s
+        self._schedule_next()
 
 
 # -------------------------------
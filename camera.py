@@ -1,8 +1,11 @@
 from datetime import datetime
 import os
 import cv2
+import numpy as np
 import time
 from logger import setup_logger
+from config import Config
+from settings import get_interval_minutes_from_settings, clamp_burst_frames, clamp_bracket_stops
 
 # Attempt to import Picamera2 (only available on Raspberry Pi)
 try:
@@ -23,54 +26,169 @@ def capture_image(settings):
     """
     Capture an image based on the current camera source setting.
     Calls either the DroidCam or Picamera capture function.
+    Warns if the capture took longer than the background capture interval.
+
+    Returns:
+        str or None: Path to saved image file or None on failure
     """
+    start = time.perf_counter()
     if settings.get('camera_source') == 'droidcam':
-        droidcam_capture_image(settings.get('droidcam_ip'), settings.get('droidcam_port'))
+        filepath = droidcam_capture_image(
+            settings.get('droidcam_ip'),
+            settings.get('droidcam_port'),
+            capture_mode=settings.get('droidcam_capture_mode', 'single'),
+            burst_frames=settings.get('droidcam_burst_frames', Config.BURST_DEFAULT_FRAMES),
+            merge_method=settings.get('droidcam_merge_method', 'mean')
+        )
     else:
-        picam_capture_image(settings.get('picam_awb_mode'))
+        filepath = picam_capture_image(
+            settings.get('picam_awb_mode'),
+            capture_mode=settings.get('picam_capture_mode', 'single'),
+            burst_frames=settings.get('picam_burst_frames', Config.BURST_DEFAULT_FRAMES),
+            merge_method=settings.get('picam_merge_method', 'mean'),
+            bracket_stops=settings.get('picam_bracket_stops', Config.BRACKET_DEFAULT_STOPS)
+        )
+
+    elapsed = time.perf_counter() - start
+    interval_s = get_interval_minutes_from_settings(settings) * 60
+    if elapsed > interval_s:
+        logger.warning(f'Capture took {elapsed:.1f}s, longer than the capture interval ({interval_s}s).')
+
+    return filepath
+
+
+def build_image_path():
+    """Return a new image path with the current timestamp: YYYYMMDD_HHMMSS."""
+    timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+    return os.path.join(Config.IMAGE_DIR, f'image_{timestamp}.jpg')
 
 
-def droidcam_capture_image(ip, port):
+def log_stage_timings(timings):
+    """Log per-stage capture timings (seconds) on a single line."""
+    stages = ', '.join(f'{stage}={seconds:.2f}s' for stage, seconds in timings.items())
+    logger.info(f'Capture timings: {stages} (total={sum(timings.values()):.2f}s)')
+
+
+# -------------------------------
+# Frame merging
+# -------------------------------
+class FrameMerger:
+    """
+    Merge equally sized BGR frames into a single 8-bit image as they arrive.
+
+    Frames are folded into one buffer while capturing instead of being kept
+    in a list: 'mean' keeps a running float32 sum, 'median' fills a
+    preallocated (n, h, w, 3) buffer, and 'mertens' (exposure fusion of a
+    short bracket) keeps the frames since the fusion needs all of them.
+    """
+
+    def __init__(self, method='mean', max_frames=1):
+        self.method = method
+        self.max_frames = max_frames
+        self.count = 0
+        self._buffer = None
+        self._frames = []
+
+    def add(self, frame):
+        """Fold a frame into the merge buffer."""
+        if self.method == 'mertens':
+            self._frames.append(frame)
+        elif self.method == 'median':
+            if self._buffer is None:
+                self._buffer = np.empty((self.max_frames,) + frame.shape, dtype=np.uint8)
+            self._buffer[self.count] = frame
+        else:
+            # Default: mean; accumulate in float32 to avoid uint8 overflow
+            if self._buffer is None:
+                self._buffer = np.zeros(frame.shape, dtype=np.float32)
+            self._buffer += frame
+        self.count += 1
+
+    def result(self):
+        """Return the merged uint8 image, or None if no frame was added."""
+        if self.count == 0:
+            return None
+
+        if self.method == 'mertens':
+            if self.count == 1:
+                return self._frames[0]
+            # Mertens fusion needs no exposure times and returns float32 in [0, 1]
+            fused = cv2.createMergeMertens().process(self._frames)
+            return np.clip(fused * 255.0, 0, 255).astype(np.uint8)
+
+        if self.method == 'median':
+            # Partition the buffer in place rather than copying it
+            merged = np.median(self._buffer[:self.count], axis=0, overwrite_input=True)
+            return merged.astype(np.uint8)
+
+        self._buffer /= self.count
+        return np.clip(np.rint(self._buffer), 0, 255).astype(np.uint8)
+
+
+# -------------------------------
+# Camera capture
+# -------------------------------
+def droidcam_capture_image(ip, port, capture_mode='single', burst_frames=1, merge_method='mean'):
     """
     Capture an image from the DroidCam MJPEG stream using OpenCV.
 
     Args:
         ip (str): IP address of the DroidCam stream
         port (str/int): Port of the DroidCam stream
+        capture_mode (str): 'single' or 'burst' (the stream has no exposure control)
+        burst_frames (int): Number of frames to merge in burst mode
+        merge_method (str): 'mean' or 'median' merge for burst mode
 
     Returns:
         str or None: Path to saved image file or None on failure
     """
     try:
+        timings = {}
+        frame_count = clamp_burst_frames(burst_frames) if capture_mode == 'burst' else 1
+
         # Construct the MJPEG stream URL for DroidCam
         stream_url = f'http://{ip}:{port}/video'
 
         # Open the video stream using OpenCV's VideoCapture
+        start = time.perf_counter()
         cap = cv2.VideoCapture(stream_url)
 
         # Check if the stream was successfully opened
         if not cap.isOpened():
             logger.error('DroidCam stream could not be opened.')
             return None
+        timings['open'] = time.perf_counter() - start
 
-        # Read one frame from the video stream
-        ret, frame = cap.read()
+        # Read the requested number of frames from the video stream,
+        # merging each one as it arrives
+        start = time.perf_counter()
+        merger = FrameMerger(merge_method, frame_count)
+        for _ in range(frame_count):
+            ret, frame = cap.read()
+            if ret and frame is not None:
+                merger.add(frame)
+        timings['capture'] = time.perf_counter() - start
 
         # Release the VideoCapture resource immediately after reading
         cap.release()
 
-        # Check if the frame was successfully captured
-        if not ret or frame is None:
+        # Check if at least one frame was successfully captured
+        if merger.count == 0:
             logger.error('Failed to capture image from DroidCam.')
             return None
 
-        # Generate a filename with current timestamp: YYYYMMDD_HHMMSS
-        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-        filepath = os.path.join('static/images', f'image_{timestamp}.jpg')
+        start = time.perf_counter()
+        image = merger.result()
+        timings['merge'] = time.perf_counter() - start
 
-        # Save the captured frame as a JPEG image
-        cv2.imwrite(filepath, frame)
-        logger.info(f'Image captured and saved to {filepath}')
+        # Save the (merged) frame as a JPEG image
+        filepath = build_image_path()
+        start = time.perf_counter()
+        cv2.imwrite(filepath, image)
+        timings['write'] = time.perf_counter() - start
+
+        logger.info(f'Image captured and saved to {filepath} ({merger.count} frame(s), mode={capture_mode})')
+        log_stage_timings(timings)
 
         return filepath
 
@@ -80,23 +198,95 @@ def droidcam_capture_image(ip, port):
         return None
 
 
-def picam_capture_image(awb_mode):
+def picam_exposure(metadata):
+    """Return the (ExposureTime, AnalogueGain) pair reported in frame metadata."""
+    return metadata.get('ExposureTime'), metadata.get('AnalogueGain')
+
+
+def picam_capture_settled(picam, previous_exposure):
+    """
+    Capture a frame once the AE loop has applied a new exposure.
+
+    Keeps capturing requests until the metadata exposure differs from
+    previous_exposure and is unchanged from the frame before (i.e. the AE
+    loop has converged). Falls back to the latest frame after
+    Config.BRACKET_SETTLE_TIMEOUT_SEC.
+
+    Returns:
+        tuple: (frame, exposure) of the accepted frame
+    """
+    deadline = time.monotonic() + Config.BRACKET_SETTLE_TIMEOUT_SEC
+    last_exposure = None
+    while True:
+        request = picam.capture_request()
+        try:
+            exposure = picam_exposure(request.get_metadata())
+            settled = exposure != previous_exposure and exposure == last_exposure
+            if settled or time.monotonic() >= deadline:
+                if not settled:
+                    logger.warning(f'Exposure did not settle for bracket step (exposure={exposure}).')
+                return request.make_array('main'), exposure
+        finally:
+            request.release()
+        last_exposure = exposure
+
+
+def picam_capture_frames(picam, merger, capture_mode, burst_frames, bracket_stops):
+    """
+    Capture frames from an already started Picamera2 session into a FrameMerger.
+
+    Burst mode grabs consecutive frames at the current exposure, bracket mode
+    steps the 'ExposureValue' control through bracket_stops and grabs one
+    frame per stop once the metadata shows the new exposure. The exposure
+    value is reset to 0 afterwards.
+    """
+    if capture_mode == 'bracket':
+        current_ev = 0.0
+        exposure = picam_exposure(picam.capture_metadata())
+        try:
+            for ev in bracket_stops:
+                if ev == current_ev:
+                    # No exposure change expected; take the next frame as is
+                    merger.add(picam.capture_array('main'))
+                    continue
+                picam.set_controls({'ExposureValue': ev})
+                frame, exposure = picam_capture_settled(picam, exposure)
+                merger.add(frame)
+                current_ev = ev
+        finally:
+            picam.set_controls({'ExposureValue': 0.0})
+    else:
+        for _ in range(burst_frames):
+            merger.add(picam.capture_array('main'))
+
+
+def picam_capture_image(awb_mode, capture_mode='single', burst_frames=1, merge_method='mean', bracket_stops=None):
     """
     Capture an image using the Raspberry Pi Picamera2 with specified AWB mode.
 
     Args:
         awb_mode (str): Auto White Balance mode for the camera
+        capture_mode (str): 'single', 'burst' or 'bracket'
+        burst_frames (int): Number of frames to merge in burst mode
+        merge_method (str): 'mean' or 'median' merge for burst mode
+        bracket_stops (list[float]): Exposure values (EV) for bracket mode
 
     Returns:
         str or None: Path to saved image file or None on failure
     """
     picam = None
     try:
+        timings = {}
+        if not bracket_stops:
+            bracket_stops = Config.BRACKET_DEFAULT_STOPS
+
         # Initialize Picamera2 object
+        start = time.perf_counter()
         picam = Picamera2()
 
-        # Configure the camera for still image capture with default settings
-        picam.configure(picam.create_still_configuration())
+        # Configure the camera for still image capture; RGB888 yields
+        # BGR-ordered arrays so frames can be handed to OpenCV directly
+        picam.configure(picam.create_still_configuration(main={'format': 'RGB888'}))
 
         # Set Auto White Balance mode control
         picam.set_controls({'AwbMode': awb_mode})
@@ -104,12 +294,36 @@ def picam_capture_image(awb_mode):
         # Start the camera and wait for it to stabilize
         picam.start()
         time.sleep(2)
+        timings['warmup'] = time.perf_counter() - start
+
+        filepath = build_image_path()
+
+        if capture_mode in ('burst', 'bracket'):
+            # Capture all frames from the warm session and merge them in memory
+            if capture_mode == 'bracket':
+                bracket_stops = clamp_bracket_stops(bracket_stops)
+                merger = FrameMerger('mertens', len(bracket_stops))
+            else:
+                burst_frames = clamp_burst_frames(burst_frames)
+                merger = FrameMerger(merge_method, burst_frames)
+            start = time.perf_counter()
+            picam_capture_frames(picam, merger, capture_mode, burst_frames, bracket_stops)
+            timings['capture'] = time.perf_counter() - start
 
-        # Generate filename with current timestamp: YYYYMMDD_HHMMSS
-        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-        filepath = f'static/images/image_{timestamp}.jpg'
+            start = time.perf_counter()
+            image = merger.result()
+            timings['merge'] = time.perf_counter() - start
+
+            start = time.perf_counter()
+            cv2.imwrite(filepath, image)
+            timings['write'] = time.perf_counter() - start
+
+            logger.info(f'Image captured and saved to {filepath} ({merger.count} frame(s), mode={capture_mode})')
+            log_stage_timings(timings)
+            return filepath
 
         # Capture still image to file
+        start = time.perf_counter()
         for attempt in range(3):
             try:
                 picam.capture_file(filepath)
@@ -117,7 +331,12 @@ def picam_capture_image(awb_mode):
             except Exception as e:
                 logger.error(f"Error capturing image (attempt {attempt+1}): {e}")
                 time.sleep(1)
+        else:
+            logger.error('Failed to capture image from PiCam after 3 attempts.')
+            return None
+        timings['capture'] = time.perf_counter() - start
         logger.info(f'Image captured and saved to {filepath}')
+        log_stage_timings(timings)
 
         return filepath
     except IndexError: 
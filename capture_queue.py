@@ -0,0 +1,383 @@
+import json
+import os
+import queue
+import threading
+import time
+import uuid
+from camera import capture_image
+from logger import setup_logger
+from config import Config
+
+# Attempt to import fcntl (POSIX only) for the journal process lock
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+# -------------------------------
+# Logging setup
+# -------------------------------
+logger = setup_logger(__name__)
+
+# -------------------------------
+# Capture queue class with logic
+# -------------------------------
+_queue_instance = None
+
+# Job states
+QUEUED = 'queued'
+RUNNING = 'running'
+SUCCEEDED = 'succeeded'
+FAILED = 'failed'
+INTERRUPTED = 'interrupted'  # was queued/running when the app stopped unexpectedly
+MISSED = 'missed'            # scheduled capture that never ran (app was down)
+BACKFILLED = 'backfilled'    # interrupted/missed job covered by a later successful capture
+
+PENDING_STATES = (QUEUED, RUNNING)
+BACKFILL_STATES = (INTERRUPTED, MISSED)
+
+
+class CaptureJournal:
+    """
+    Append-only JSON lines journal of capture job snapshots.
+
+    Every state change appends the full job dict and is fsynced, so the last
+    snapshot per job id survives a crash or power cut.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.lines = 0  # records in the file, used to decide when to compact
+        self._lock = threading.Lock()
+        self._lock_file = None
+
+    def acquire(self):
+        """
+        Take an exclusive process lock on the journal.
+        Raises RuntimeError if another process (e.g. a running server) holds it.
+        """
+        self._lock_file = open(f'{self.path}.lock', 'w')
+        if fcntl is None:
+            return
+        try:
+            fcntl.flock(self._lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            self.release()
+            raise RuntimeError(f"Capture journal {self.path} is in use by another process.")
+
+    def release(self):
+        """Release the process lock taken by acquire()."""
+        if self._lock_file:
+            self._lock_file.close()
+            self._lock_file = None
+
+    def append(self, record: dict):
+        """Append a record and flush it to disk."""
+        with self._lock:
+            with open(self.path, 'a') as f:
+                f.write(json.dumps(record) + '\n')
+                f.flush()
+                os.fsync(f.fileno())
+            self.lines += 1
+
+    def replay(self):
+        """Return the journal records in order, skipping a torn last line."""
+        records = []
+        try:
+            with open(self.path, 'r') as f:
+                for line in f:
+                    try:
+                        records.append(json.loads(line))
+                    except json.JSONDecodeError:
+                        logger.warning("Skipping corrupt capture journal line.")
+            self.lines = len(records)
+        except FileNotFoundError:
+            pass
+        return records
+
+    def compact(self, records):
+        """Atomically rewrite the journal with the given records."""
+        tmp_path = f'{self.path}.tmp'
+        with self._lock:
+            with open(tmp_path, 'w') as f:
+                for record in records:
+                    f.write(json.dumps(record) + '\n')
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.path)
+            self.lines = len(records)
+
+
+class CaptureQueue(threading.Thread):
+    """
+    Thread that serializes all camera access through a single job queue.
+
+    Requests arriving within the coalesce window of a pending or just finished
+    job return that job instead of creating a new one. Failed captures are
+    retried with exponential backoff, and every state change is journaled.
+    At most Config.CAPTURE_JOURNAL_MAX_JOBS finished jobs are kept, and the
+    journal is compacted once it holds twice that many records.
+    """
+
+    def __init__(self, settings_getter, journal_path: str = Config.CAPTURE_JOURNAL_FILE):
+        super().__init__(daemon=True)
+        self.settings_getter = settings_getter
+        self.journal = CaptureJournal(journal_path)
+        self.jobs = {}  # job id -> job dict, insertion ordered
+        self._schedule = None  # journaled schedule record not yet served by a capture
+        self._lock = threading.Lock()
+        self._queue = queue.Queue()
+        self._stop_event = threading.Event()
+        self.journal.acquire()
+        self._recover()
+
+    # --- Journal recovery ---
+    def _recover(self):
+        """Load jobs from the journal and flag work lost in a crash."""
+        schedule = None
+        for record in self.journal.replay():
+            if record.get('event') == 'schedule':
+                schedule = record
+            elif record.get('event') == 'unschedule':
+                schedule = None
+            elif 'id' in record:
+                # Any capture around the due time (incl. coalesced ones) served the schedule
+                if schedule and record['created_at'] >= schedule['due'] - Config.CAPTURE_COALESCE_SEC:
+                    schedule = None
+                self.jobs[record['id']] = record
+
+        now = time.time()
+        for job in self.jobs.values():
+            if job['state'] in PENDING_STATES:
+                job['state'] = INTERRUPTED
+                job['updated_at'] = now
+
+        # A pending schedule entry means the background capture was active but
+        # its next capture never ran; record one job covering the whole outage
+        if schedule and schedule['due'] < now:
+            interval_s = max(1, schedule['interval_s'])
+            missed_count = int((now - schedule['due']) // interval_s) + 1
+            job = self._new_job(
+                'scheduled',
+                state=MISSED,
+                first_due=schedule['due'],
+                last_due=schedule['due'] + (missed_count - 1) * interval_s,
+                missed_count=missed_count
+            )
+            self.jobs[job['id']] = job
+            schedule = None
+        self._schedule = schedule
+
+        # Keep only the most recent jobs and drop superseded snapshots
+        self.jobs = {job['id']: job for job in sorted(self.jobs.values(), key=lambda job: job['created_at'])}
+        self._prune()
+        self._compact()
+
+        lost = [job for job in self.jobs.values() if job['state'] in BACKFILL_STATES]
+        if lost:
+            missed = sum(job.get('missed_count', 1) for job in lost)
+            logger.warning(f"Capture journal: {missed} capture(s) were interrupted or missed and can be backfilled.")
+
+    # --- Job handling ---
+    def _new_job(self, source, state=QUEUED, created_at=None, **extra):
+        created_at = created_at or time.time()
+        job = {
+            'id': uuid.uuid4().hex[:12],
+            'source': source,
+            'state': state,
+            'created_at': created_at,
+            'updated_at': created_at,
+            'attempts': 0,
+            'path': None,
+            'error': None,
+        }
+        job.update(extra)
+        return job
+
+    def _journal(self, record):
+        """Append a record, compacting the journal once it passes the line threshold. Caller holds self._lock."""
+        self.journal.append(record)
+        if self.journal.lines > 2 * Config.CAPTURE_JOURNAL_MAX_JOBS:
+            self._compact()
+
+    def _compact(self):
+        """Rewrite the journal with the current job snapshots and pending schedule. Caller holds self._lock."""
+        records = list(self.jobs.values())
+        if self._schedule:
+            records.append(self._schedule)
+        self.journal.compact(records)
+
+    def _prune(self):
+        """Drop the oldest finished jobs beyond Config.CAPTURE_JOURNAL_MAX_JOBS. Caller holds self._lock."""
+        excess = len(self.jobs) - Config.CAPTURE_JOURNAL_MAX_JOBS
+        if excess <= 0:
+            return
+        finished = [job_id for job_id, job in self.jobs.items() if job['state'] not in PENDING_STATES]
+        for job_id in finished[:excess]:
+            del self.jobs[job_id]
+
+    def _update(self, job, **changes):
+        """Apply changes to a job and journal the new snapshot."""
+        with self._lock:
+            job.update(changes)
+            job['updated_at'] = time.time()
+            self._prune()
+            self._journal(dict(job))
+
+    def _submit(self, source):
+        """Queue a capture or return the job it coalesces with. Caller holds self._lock."""
+        now = time.time()
+        for job in reversed(self.jobs.values()):
+            if now - job['created_at'] > Config.CAPTURE_COALESCE_SEC:
+                break
+            if job['state'] in PENDING_STATES + (SUCCEEDED,):
+                logger.info(f"Capture request ({source}) coalesced into job {job['id']}.")
+                return job
+
+        job = self._new_job(source)
+        self.jobs[job['id']] = job
+        # Any capture around the due time serves the pending schedule
+        if self._schedule and job['created_at'] >= self._schedule['due'] - Config.CAPTURE_COALESCE_SEC:
+            self._schedule = None
+        self._prune()
+        self._journal(dict(job))
+        self._queue.put(job['id'])
+        return job
+
+    def _mark_backfilled(self, job):
+        """Mark the jobs listed in job['backfill_of'] as backfilled. Caller holds self._lock."""
+        for lost_id in job.get('backfill_of', []):
+            lost = self.jobs.get(lost_id)
+            if lost and lost['state'] in BACKFILL_STATES:
+                lost.update(state=BACKFILLED, backfilled_by=job['id'], updated_at=time.time())
+                self._journal(dict(lost))
+
+    def submit(self, source='manual'):
+        """Queue a capture, or return the id of a job it coalesces with."""
+        with self._lock:
+            return self._submit(source)['id']
+
+    def backfill(self):
+        """
+        Queue one capture covering all interrupted/missed jobs; return its id or None.
+
+        The lost jobs keep their state until that capture succeeds, so a failed
+        backfill can be retried. Repeated calls attach to the same pending job.
+        """
+        with self._lock:
+            lost_ids = [job['id'] for job in self.jobs.values() if job['state'] in BACKFILL_STATES]
+            if not lost_ids:
+                return None
+            # Attach to a pending backfill regardless of the coalesce window
+            pending = [job for job in self.jobs.values() if job['state'] in PENDING_STATES and 'backfill_of' in job]
+            job = pending[-1] if pending else self._submit('backfill')
+            claimed = job.get('backfill_of', [])
+            job['backfill_of'] = claimed + [lost_id for lost_id in lost_ids if lost_id not in claimed]
+            self._journal(dict(job))
+            if job['state'] == SUCCEEDED:
+                # Coalesced into a capture that already succeeded
+                self._mark_backfilled(job)
+            return job['id']
+
+    def get(self, job_id):
+        """Return a copy of the job or None."""
+        with self._lock:
+            job = self.jobs.get(job_id)
+            return dict(job) if job else None
+
+    def list_jobs(self, state=None):
+        """Return copies of all jobs (optionally filtered by state), newest first."""
+        with self._lock:
+            return [dict(job) for job in reversed(self.jobs.values()) if state is None or job['state'] == state]
+
+    def record_schedule(self, due, interval_s):
+        """Journal the next scheduled capture so it can be detected as missed after a crash."""
+        with self._lock:
+            self._schedule = {'event': 'schedule', 'due': due, 'interval_s': interval_s}
+            self._journal(self._schedule)
+
+    def clear_schedule(self):
+        """Journal that background capture was stopped deliberately."""
+        with self._lock:
+            self._schedule = None
+            self._journal({'event': 'unschedule', 'at': time.time()})
+
+    # --- Worker ---
+    def run(self):
+        while not self._stop_event.is_set():
+            try:
+                job_id = self._queue.get(timeout=0.5)
+            except queue.Empty:
+                continue
+            job = self.jobs.get(job_id)
+            if job:
+                self._process(job)
+
+    def _process(self, job):
+        """Run a capture job with retries and exponential backoff."""
+        backoff = Config.CAPTURE_RETRY_BACKOFF_SEC
+        for attempt in range(1, Config.CAPTURE_MAX_ATTEMPTS + 1):
+            self._update(job, state=RUNNING, attempts=attempt)
+            try:
+                path = capture_image(self.settings_getter())
+                error = None if path else 'capture returned no image'
+            except Exception as e:
+                path, error = None, str(e)
+
+            if path:
+                with self._lock:
+                    job.update(state=SUCCEEDED, path=path, error=None, updated_at=time.time())
+                    self._journal(dict(job))
+                    self._mark_backfilled(job)
+                logger.info(f"Capture job {job['id']} ({job['source']}) succeeded: {path}")
+                return
+
+            logger.warning(f"Capture job {job['id']} attempt {attempt} failed: {error}")
+            self._update(job, error=error)
+            if attempt < Config.CAPTURE_MAX_ATTEMPTS and self._stop_event.wait(backoff):
+                break
+            backoff *= 2
+
+        if self._stop_event.is_set():
+            # Leave the job as running in the journal so it is recovered as interrupted
+            return
+        self._update(job, state=FAILED)
+        logger.error(f"Capture job {job['id']} ({job['source']}) failed after {job['attempts']} attempt(s).")
+
+    def stop(self):
+        """Signal the worker to stop and return immediately."""
+        self._stop_event.set()
+
+
+# -------------------------------
+# Helpers
+# -------------------------------
+def start_capture_queue(settings_getter):
+    """Start the capture queue worker, recovering jobs from the journal."""
+    global _queue_instance
+    stop_capture_queue()
+    q = CaptureQueue(settings_getter)
+    q.start()
+    _queue_instance = q
+    logger.info("Capture queue started.")
+    return q
+
+def stop_capture_queue(join: bool = True):
+    """Stop the capture queue worker if running."""
+    global _queue_instance
+    q = _queue_instance
+    if q and q.is_alive():
+        logger.info("Stopping capture queue…")
+        q.stop()
+        if join:
+            q.join(timeout=5.0)
+        logger.info("Capture queue stopped.")
+    if q:
+        q.journal.release()
+    _queue_instance = None
+
+def get_capture_queue():
+    """Return the running capture queue; raises RuntimeError if not started."""
+    if _queue_instance is None:
+        raise RuntimeError("Capture queue is not running.")
+    return _queue_instance
@@ -23,6 +23,31 @@ class Config:
     )
     SQLALCHEMY_TRACK_MODIFICATIONS = False
 
+    # Burst / bracket capture
+    BURST_DEFAULT_FRAMES = 5
+    BURST_MAX_FRAMES = 16
+    BRACKET_DEFAULT_STOPS = [-2.0, 0.0, 2.0]
+    BRACKET_EV_MIN = -8.0  # range of the libcamera ExposureValue control
+    BRACKET_EV_MAX = 8.0
+    BRACKET_SETTLE_TIMEOUT_SEC = 5.0
+
+    # Capture queue
+    CAPTURE_JOURNAL_FILE = 'logs/capture_journal.jsonl'
+    CAPTURE_JOURNAL_MAX_JOBS = 500
+    CAPTURE_COALESCE_SEC = 10
+    CAPTURE_MAX_ATTEMPTS = 3
+    CAPTURE_RETRY_BACKOFF_SEC = 2
+
+    # Cloudflare tunnel supervisor
+    CLOUDFLARED_BINARY = os.getenv("CLOUDFLARED_BIN", "cloudflared")  # point to a stand-in for testing
+    CLOUDFLARED_METRICS_PORT = 20241
+    TUNNEL_HEALTH_INTERVAL_SEC = 15
+    TUNNEL_HEALTH_TIMEOUT_SEC = 3
+    TUNNEL_HEALTH_MAX_FAILURES = 3
+    TUNNEL_BACKOFF_MIN_SEC = 2
+    TUNNEL_BACKOFF_MAX_SEC = 300
+    TUNNEL_STABLE_SEC = 300
+
     # General settings
     BACKGROUND_CAPTURE_MIN_INTERVAL = 1
     DEBUG = False
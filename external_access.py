@@ -3,7 +3,10 @@ import threading
 import time
 import re
 import shutil
+import urllib.request
+from collections import deque
 from logger import setup_logger
+from config import Config
 
 # -------------------------------
 # Logging setup
@@ -11,62 +14,200 @@ from logger import setup_logger
 logger = setup_logger(__name__)
 
 # -------------------------------
-# Cloudflare setup
+# Cloudflare tunnel supervisor
 # -------------------------------
-def start_cloudflare_quick_tunnel(max_wait_sec=15):
+_supervisor_instance = None
+
+TUNNEL_URL_PATTERN = re.compile(r"https://[a-zA-Z0-9\-]+\.trycloudflare\.com")
+
+
+class TunnelSupervisor(threading.Thread):
     """
-    Start a Cloudflare Quick Tunnel in a daemon thread.
-    Logs the public URL if successful, otherwise logs an error and raises RuntimeError.
+    Thread that keeps a Cloudflare Quick Tunnel alive.
+
+    Launches cloudflared, parses its output for the public URL, probes the
+    tunnel's local readiness endpoint periodically and restarts the process
+    with exponential backoff when it exits or stops answering.
     """
 
-    # Check if cloudflared is installed
-    if not shutil.which("cloudflared"):
-        logger.error("cloudflared is not installed. Please install it first.")
-        raise RuntimeError("cloudflared is not installed. Please install it first.")
+    def __init__(self, port: int, binary: str = None):
+        super().__init__(daemon=True)
+        self.port = int(port)
+        self.binary = binary or Config.CLOUDFLARED_BINARY
+        self.metrics_addr = f"127.0.0.1:{Config.CLOUDFLARED_METRICS_PORT}"
+        self._stop_event = threading.Event()
+        self._lock = threading.Lock()
+        self.process = None
+        self.url = None
+        self.started_at = None  # epoch seconds of current process start
+        self.healthy = False
+        self.restarts = 0
+        self.last_error = None
+        self._output = deque(maxlen=20)  # last output lines for error reporting
 
-    tunnel_info = {"url": None, "error": None}
+    def run(self):
+        backoff = Config.TUNNEL_BACKOFF_MIN_SEC
 
-    def run_tunnel():
-        try:
-            process = subprocess.Popen(
-                ["cloudflared", "tunnel", "--url", "http://localhost:5000"],
-                stdout=subprocess.PIPE,
-                stderr=subprocess.STDOUT,
-                text=True
-            )
-
-            for line in process.stdout:
-                line = line.strip()
-                # Extract trycloudflare.com URL
-                match = re.search(r"https://[a-zA-Z0-9\-]+\.trycloudflare\.com", line)
+        while not self._stop_event.is_set():
+            try:
+                process = self._launch()
+                self._watch(process)
+            except Exception as e:
+                self.last_error = str(e)
+                logger.exception("Cloudflare tunnel supervisor error")
+            finally:
+                uptime = self.uptime_seconds() or 0
+                self._terminate()
+
+            if self._stop_event.is_set():
+                break
+
+            # Reset backoff after a stable run, otherwise grow it exponentially
+            if uptime >= Config.TUNNEL_STABLE_SEC:
+                backoff = Config.TUNNEL_BACKOFF_MIN_SEC
+            self.restarts += 1
+            logger.warning(f"Cloudflare tunnel down ({self.last_error}); restarting in {backoff:.0f}s.")
+            self._stop_event.wait(backoff)
+            backoff = min(backoff * 2, Config.TUNNEL_BACKOFF_MAX_SEC)
+
+    def _launch(self):
+        """Start cloudflared and a reader thread for its merged stdout/stderr; return the process."""
+        self.url = None
+        self.healthy = False
+        self._output.clear()
+        process = subprocess.Popen(
+            [
+                self.binary, "tunnel",
+                "--url", f"http://localhost:{self.port}",
+                "--metrics", self.metrics_addr,
+            ],
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT,
+            text=True
+        )
+        with self._lock:
+            self.process = process
+        self.started_at = time.time()
+        threading.Thread(target=self._read_output, args=(process,), daemon=True).start()
+        return process
+
+    def _read_output(self, process):
+        """Consume process output, extracting the public URL when it appears."""
+        for line in process.stdout:
+            line = line.strip()
+            if line:
+                self._output.append(line)
+            if not self.url:
+                match = TUNNEL_URL_PATTERN.search(line)
                 if match:
-                    tunnel_info["url"] = match.group(0)
-                    break
-
-            if not tunnel_info["url"]:
-                # Read stderr as fallback for errors
-                tunnel_info["error"] = process.stderr.read().strip()
-
-            # Keep process running in background
-            process.wait()
-        except Exception as e:
-            tunnel_info["error"] = str(e)
-
-    # Run in daemon thread
-    thread = threading.Thread(target=run_tunnel, daemon=True)
-    thread.start()
-
-    # Wait a short time for URL to appear
-    start_time = time.time()
-    while time.time() - start_time < max_wait_sec:
-        if tunnel_info["url"]:
-            logger.info(f"Your app is publicly reachable at: {tunnel_info['url']}")
-            return tunnel_info["url"]
-        if tunnel_info["error"]:
-            logger.error(f"Cloudflare Tunnel failed: {tunnel_info['error']}")
-            raise RuntimeError(f"Cloudflare Tunnel failed: {tunnel_info['error']}")
-        time.sleep(0.2)
-
-    # Timeout
-    logger.error("Cloudflare Tunnel did not start in time or no URL was returned.")
-    raise RuntimeError("Cloudflare Tunnel did not start in time or no URL was returned.")
\ No newline at end of file
+                    self.url = match.group(0)
+                    logger.info(f"Your app is publicly reachable at: {self.url}")
+
+    def _watch(self, process):
+        """
+        Block until the process exits, fails its health checks or stop() is called.
+        Uses the process handle from launch since stop() clears self.process from another thread.
+        """
+        failures = 0
+        while not self._stop_event.wait(Config.TUNNEL_HEALTH_INTERVAL_SEC):
+            if process.poll() is not None:
+                self.last_error = self._output[-1] if self._output else f"exited with code {process.returncode}"
+                return
+
+            if self._probe():
+                failures = 0
+                self.healthy = True
+                continue
+
+            failures += 1
+            self.healthy = False
+            if failures >= Config.TUNNEL_HEALTH_MAX_FAILURES:
+                self.last_error = f"health check failed {failures} times"
+                return
+
+    def _probe(self):
+        """Return True if cloudflared reports ready connections on its metrics endpoint."""
+        try:
+            with urllib.request.urlopen(f"http://{self.metrics_addr}/ready", timeout=Config.TUNNEL_HEALTH_TIMEOUT_SEC) as res:
+                return res.status == 200 and self.url is not None
+        except Exception:
+            return False
+
+    def _terminate(self):
+        """Terminate the current cloudflared process if it is still running."""
+        with self._lock:
+            process, self.process = self.process, None
+        self.healthy = False
+        self.started_at = None
+        if process and process.poll() is None:
+            process.terminate()
+            try:
+                process.wait(timeout=5.0)
+            except subprocess.TimeoutExpired:
+                process.kill()
+
+    def uptime_seconds(self):
+        """Return seconds since the current process was started, or None."""
+        if self.started_at is None:
+            return None
+        return int(time.time() - self.started_at)
+
+    def status(self):
+        """Return a JSON-serializable status snapshot."""
+        return {
+            'running': self.is_alive() and self.process is not None,
+            'healthy': self.healthy,
+            'url': self.url if self.process is not None else None,
+            'uptime': self.uptime_seconds(),
+            'restarts': self.restarts,
+            'last_error': self.last_error,
+        }
+
+    def stop(self):
+        """Signal the supervisor to stop and terminate cloudflared."""
+        self._stop_event.set()
+        self._terminate()
+
+
+# -------------------------------
+# Helpers
+# -------------------------------
+def start_tunnel_supervisor(port=Config.FLASK_PORT, binary=None):
+    """
+    Start the Cloudflare tunnel supervisor in a daemon thread.
+    Raises RuntimeError if the cloudflared binary cannot be found.
+    """
+    global _supervisor_instance
+    binary = binary or Config.CLOUDFLARED_BINARY
+
+    # Check if cloudflared is installed
+    if not shutil.which(binary):
+        logger.error(f"{binary} is not installed. Please install it first.")
+        raise RuntimeError(f"{binary} is not installed. Please install it first.")
+
+    stop_tunnel_supervisor()
+    t = TunnelSupervisor(port, binary)
+    t.start()
+    _supervisor_instance = t
+    logger.info(f"Cloudflare tunnel supervisor started (port={port}).")
+    return t
+
+
+def stop_tunnel_supervisor():
+    """Stop the tunnel supervisor and its cloudflared process if running."""
+    global _supervisor_instance
+    t = _supervisor_instance
+    if t and t.is_alive():
+        logger.info("Stopping Cloudflare tunnel supervisor…")
+        t.stop()
+        t.join(timeout=5.0)
+        logger.info("Cloudflare tunnel supervisor stopped.")
+    _supervisor_instance = None
+
+
+def get_tunnel_status():
+    """Return the current tunnel status, or an inactive status if not started."""
+    t = _supervisor_instance
+    if not t:
+        return {'running': False, 'healthy': False, 'url': None, 'uptime': None, 'restarts': 0, 'last_error': None}
+    return t.status()
@@ -1,4 +1,5 @@
 import json
+from config import Config
 
 # -------------------------------
 # Helpers
@@ -16,7 +17,14 @@ def load_settings(file):
             'camera_source': 'picam',
             'droidcam_ip': '0.0.0.0',
             'droidcam_port': '0000',
-            'picam_awb_mode': 1
+            'picam_awb_mode': 1,
+            'picam_capture_mode': 'single',
+            'picam_burst_frames': Config.BURST_DEFAULT_FRAMES,
+            'picam_merge_method': 'mean',
+            'picam_bracket_stops': Config.BRACKET_DEFAULT_STOPS,
+            'droidcam_capture_mode': 'single',
+            'droidcam_burst_frames': Config.BURST_DEFAULT_FRAMES,
+            'droidcam_merge_method': 'mean'
         }
 
 def save_settings(file, settings):
@@ -25,6 +33,21 @@ def save_settings(file, settings):
     with open(file, 'w') as f:
         json.dump(settings, f, indent=2)
 
+def clamp_burst_frames(burst_frames):
+    """Clamp the configured burst length to 1..Config.BURST_MAX_FRAMES."""
+    try:
+        return min(Config.BURST_MAX_FRAMES, max(1, int(burst_frames)))
+    except (ValueError, TypeError):
+        return Config.BURST_DEFAULT_FRAMES
+
+def clamp_bracket_stops(bracket_stops):
+    """Limit the bracket to Config.BURST_MAX_FRAMES stops, each within the ExposureValue range."""
+    try:
+        stops = [min(Config.BRACKET_EV_MAX, max(Config.BRACKET_EV_MIN, float(ev))) for ev in bracket_stops]
+    except (ValueError, TypeError):
+        return list(Config.BRACKET_DEFAULT_STOPS)
+    return stops[:Config.BURST_MAX_FRAMES] or list(Config.BRACKET_DEFAULT_STOPS)
+
 def get_interval_minutes_from_settings(settings: dict) -> int:
     """Parse interval minutes from settings; fallback to 60 if missing/invalid."""
     val = settings.get('background_capture_interval', 60)
@@ -41,10 +64,27 @@ def parse_form_settings(form_data: dict, current_settings: dict) -> dict:
         except (ValueError, TypeError):
             return default
 
+    def parse_choice(val, choices, default):
+        return val if val in choices else default
+
+    def parse_float_list(val, default):
+        try:
+            values = [float(v) for v in str(val).split(',') if v.strip()]
+            return values or default
+        except (ValueError, TypeError):
+            return default
+
     return {
         'background_capture_interval': max(1, parse_int(form_data.get('background_capture_interval'), current_settings.get('background_capture_interval', 60))),
         'camera_source': form_data.get('camera_source', current_settings.get('camera_source', 'picam')),
         'droidcam_ip': form_data.get('droidcam_ip', current_settings.get('droidcam_ip', '')),
         'droidcam_port': parse_int(form_data.get('droidcam_port'), current_settings.get('droidcam_port', 4747)),
-        'picam_awb_mode': parse_int(form_data.get('picam_awb_mode'), current_settings.get('picam_awb_mode', 0))
+        'picam_awb_mode': parse_int(form_data.get('picam_awb_mode'), current_settings.get('picam_awb_mode', 0)),
+        'picam_capture_mode': parse_choice(form_data.get('picam_capture_mode'), ('single', 'burst', 'bracket'), current_settings.get('picam_capture_mode', 'single')),
+        'picam_burst_frames': clamp_burst_frames(parse_int(form_data.get('picam_burst_frames'), current_settings.get('picam_burst_frames', Config.BURST_DEFAULT_FRAMES))),
+        'picam_merge_method': parse_choice(form_data.get('picam_merge_method'), ('mean', 'median'), current_settings.get('picam_merge_method', 'mean')),
+        'picam_bracket_stops': clamp_bracket_stops(parse_float_list(form_data.get('picam_bracket_stops'), current_settings.get('picam_bracket_stops', Config.BRACKET_DEFAULT_STOPS))),
+        'droidcam_capture_mode': parse_choice(form_data.get('droidcam_capture_mode'), ('single', 'burst'), current_settings.get('droidcam_capture_mode', 'single')),
+        'droidcam_burst_frames': clamp_burst_frames(parse_int(form_data.get('droidcam_burst_frames'), current_settings.get('droidcam_burst_frames', Config.BURST_DEFAULT_FRAMES))),
+        'droidcam_merge_method': parse_choice(form_data.get('droidcam_merge_method'), ('mean', 'median'), current_settings.get('droidcam_merge_method', 'mean'))
     }
\ No newline at end of file
@@ -3,6 +3,11 @@ document.addEventListener("DOMContentLoaded", () => {
   const progressBar = document.getElementById("background_capture_progress");
   const progressText = document.getElementById("background_capture_text");
   const latestImg = document.getElementById("latest-image");
+  const captureButton = document.getElementById("capture_button");
+  const captureStatus = document.getElementById("capture_status");
+  const tunnelBadge = document.getElementById("tunnel_status_badge");
+  const tunnelUrl = document.getElementById("tunnel_url");
+  const tunnelUptime = document.getElementById("tunnel_uptime");
 
   let countdown = 0;
   let intervalTotal = 0;
@@ -38,6 +43,70 @@ document.addEventListener("DOMContentLoaded", () => {
       .catch(err => console.error("Failed to fetch background capture status:", err));
   };
 
+  const pollCaptureJob = (jobId) => {
+    fetch(`/capture/${jobId}`)
+      .then(res => res.json())
+      .then(job => {
+        if (job.state === "queued" || job.state === "running") {
+          captureStatus.innerText = job.attempts > 1 ? `Capturing (attempt ${job.attempts})…` : "Capturing…";
+          setTimeout(() => pollCaptureJob(jobId), 1000);
+          return;
+        }
+        captureButton.disabled = false;
+        captureStatus.innerText = job.state === "succeeded" ? "Image captured successfully!" : "Failed to capture image.";
+        updateLatestImage();
+      })
+      .catch(err => {
+        console.error("Error polling capture job:", err);
+        captureButton.disabled = false;
+        captureStatus.innerText = "";
+      });
+  };
+
+  captureButton.addEventListener("click", () => {
+    captureButton.disabled = true;
+    captureStatus.innerText = "Queued…";
+    fetch("/capture", { method: "POST" })
+      .then(res => res.json())
+      .then(job => {
+        if (!job.id) throw new Error(job.error || "No job id returned");
+        pollCaptureJob(job.id);
+      })
+      .catch(err => {
+        console.error("Error queuing capture:", err);
+        captureButton.disabled = false;
+        captureStatus.innerText = "Failed to capture image.";
+      });
+  });
+
+  const formatUptime = (seconds) => {
+    const h = Math.floor(seconds / 3600);
+    const m = Math.floor((seconds % 3600) / 60);
+    return h > 0 ? `${h} h ${m} min` : `${m} min`;
+  };
+
+  const updateTunnelStatus = () => {
+    fetch("/tunnel_status")
+      .then(res => res.json())
+      .then(data => {
+        let label = "Off";
+        let color = "bg-secondary";
+        if (data.running && data.healthy) {
+          label = "Online";
+          color = "bg-success";
+        } else if (data.running || data.restarts > 0) {
+          label = "Connecting";
+          color = "bg-warning";
+        }
+        tunnelBadge.innerText = label;
+        tunnelBadge.className = `badge ${color}`;
+        tunnelUrl.innerText = data.url || "";
+        tunnelUrl.href = data.url || "#";
+        tunnelUptime.innerText = data.uptime != null ? `Uptime: ${formatUptime(data.uptime)}` : "";
+      })
+      .catch(err => console.error("Failed to fetch tunnel status:", err));
+  };
+
   const updateProgress = () => {
     if (intervalTotal > 0) {
       countdown++;
@@ -73,8 +142,10 @@ document.addEventListener("DOMContentLoaded", () => {
 
   updateStatus();
   updateLatestImage();
+  updateTunnelStatus();
 
   setInterval(updateStatus, 60000);
   setInterval(updateLatestImage, 5000);
+  setInterval(updateTunnelStatus, 30000);
   setInterval(updateProgress, 1000);
 });
@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+"""
+Minimal stand-in for `cloudflared tunnel` used to exercise the tunnel supervisor.
+
+Prints a trycloudflare.com URL like the real binary and serves `/ready` on the
+`--metrics` address. Environment variables:
+    FAKE_CLOUDFLARED_LIFETIME  seconds until the process exits (default: run forever)
+    FAKE_CLOUDFLARED_UNHEALTHY set to 1 to answer `/ready` with 503
+
+Usage:
+    CLOUDFLARED_BIN=tools/fake_cloudflared.py python app.py
+"""
+import os
+import sys
+import time
+import secrets
+import threading
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+
+class ReadyHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        unhealthy = os.getenv("FAKE_CLOUDFLARED_UNHEALTHY") == "1"
+        self.send_response(503 if unhealthy or self.path != "/ready" else 200)
+        self.end_headers()
+
+    def log_message(self, format, *args):
+        pass
+
+
+def main(argv):
+    metrics = argv[argv.index("--metrics") + 1] if "--metrics" in argv else "127.0.0.1:20241"
+    host, port = metrics.rsplit(":", 1)
+    server = HTTPServer((host, int(port)), ReadyHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    print(f"INF Starting metrics server on {metrics}/metrics", flush=True)
+    print(f"INF |  https://fake-{secrets.token_hex(4)}.trycloudflare.com  |", flush=True)
+
+    lifetime = os.getenv("FAKE_CLOUDFLARED_LIFETIME")
+    try:
+        if lifetime:
+            time.sleep(float(lifetime))
+            print("ERR fake tunnel exiting", flush=True)
+            return 1
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        return 0
+    finally:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))